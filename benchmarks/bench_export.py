@@ -0,0 +1,56 @@
+"""measures the time to write the job csv rows of many jobs, with csv.writer
+writing a row per job as before and with JobWriter, to os.devnull and, when a
+filename is given, to that file. The jobs of 2 synthetic days are repeated to
+the requested number of jobs (5 million by default)
+
+usage: python benchmarks/bench_export.py [jobs [filename]]
+"""
+import csv
+import os
+import sys
+import time
+from itertools import cycle, islice
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job import CSV_BUFFER, JobWriter, filter_records, header_csv, split_records, update_jobs  # noqa: E402
+from synthetic import accounting_lines  # noqa: E402
+
+
+def csv_writer(csv_fd, jobs):
+    """writes a row per job with csv.writer
+    """
+    csv_file = csv.writer(csv_fd)
+    csv_file.writerow(header_csv())
+    for job in jobs:
+        csv_file.writerow(job.prepare_csv())
+
+
+def job_writer(csv_fd, jobs):
+    """writes the rows with JobWriter, as job.py does
+    """
+    csv_file = JobWriter(csv_fd)
+    csv_file.writerow(header_csv())
+    for job in jobs:
+        csv_file.writerow(job.prepare_csv())
+    csv_file.flush()
+
+
+def main():
+    njobs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    filenames = [os.devnull] + sys.argv[2:3]
+    torquejobs = {}
+    for entry in split_records(filter_records(accounting_lines(2), {'E'})):
+        update_jobs(torquejobs, entry)
+    pool = list(torquejobs.values())
+    for filename in filenames:
+        for writer in (csv_writer, job_writer):
+            start = time.perf_counter()
+            with open(filename, 'w', buffering=CSV_BUFFER) as csv_fd:
+                writer(csv_fd, islice(cycle(pool), njobs))
+            seconds = time.perf_counter() - start
+            print('%-10s %-12s %9d jobs %6.2f s' % (os.path.basename(filename), writer.__name__, njobs, seconds))
+
+
+if __name__ == '__main__':
+    main()
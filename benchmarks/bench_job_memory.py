@@ -0,0 +1,35 @@
+"""measures the memory per Job object (bytes per job, as traced by
+tracemalloc) after all records of synthetic days have been processed, for
+ended jobs only, for all record types with the transition log (--full) and
+for lazily parsed jobs (--lazy). The records are split while tracing, so the
+parts of the records a job keeps count towards it
+
+usage: python benchmarks/bench_job_memory.py [days]
+"""
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job import filter_records, split_records, update_jobs  # noqa: E402
+from synthetic import accounting_lines  # noqa: E402
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    lines = accounting_lines(days)
+    for label, types, keeplog, lazy in (('E only', {'E'}, False, False),
+                                        ('full', None, True, False),
+                                        ('E only, lazy', {'E'}, False, True)):
+        tracemalloc.start()
+        torquejobs = {}
+        for entry in split_records(filter_records(lines, types)):
+            update_jobs(torquejobs, entry, keeplog, lazy)
+        traced, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%-14s %7d jobs %6.0f bytes/job' % (label, len(torquejobs), traced / len(torquejobs)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""measures the lines per second of parsing the properties of accounting
+messages, with the findall/split tokenizer Job.parse used before and with
+parse_properties
+
+usage: python benchmarks/bench_properties.py [days]
+"""
+import os
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from job import parse_properties  # noqa: E402
+from synthetic import accounting_lines  # noqa: E402
+
+
+def findall_split(message):
+    """the tokenizer of Job.parse before parse_properties
+    """
+    props = re.findall(r"\S*=", message)
+    vals = re.split(r"\S*=", message)
+    props = list(filter(None, props))
+    vals = list(filter(None, vals))
+    prop = list(i[:-1] for i in props)
+    val = list(i.rstrip() for i in vals)
+    return dict(zip(prop, val))
+
+
+def main():
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    messages = [''.join(line.split(';')[3:]) for line in accounting_lines(days)]
+    for tokenizer in (findall_split, parse_properties):
+        start = time.perf_counter()
+        for message in messages:
+            tokenizer(message)
+        seconds = time.perf_counter() - start
+        print('%-16s %9.0f lines/s' % (tokenizer.__name__, len(messages) / seconds))
+
+
+if __name__ == '__main__':
+    main()
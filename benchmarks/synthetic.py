@@ -0,0 +1,83 @@
+"""generates synthetic Torque accounting records for the benchmarks: a mix of
+Q, S, E and D records of jobs on 40 nodes, in timestamp order
+"""
+import calendar
+import os
+import random
+import time
+
+USERS = ['user%02d' % i for i in range(30)]
+QUEUES = ['batch', 'long', 'short']
+NODES = ['node%03d' % i for i in range(40)]
+START = calendar.timegm((2021, 12, 30, 0, 0, 0))
+
+
+def timestamp(epoch):
+    return time.strftime('%m/%d/%Y %H:%M:%S', time.gmtime(epoch))
+
+
+def hms(seconds):
+    return '%02d:%02d:%02d' % (seconds // 3600, seconds // 60 % 60, seconds % 60)
+
+
+def accounting_records(days, jobs_per_day=300, seed=1):
+    """returns a list of (epoch, line) of days of jobs, sorted on epoch
+    """
+    rng = random.Random(seed)
+    records = []
+    jobid = 1000
+    for day in range(days):
+        for _ in range(jobs_per_day):
+            jobid += 1
+            user = rng.choice(USERS)
+            queue = rng.choice(QUEUES)
+            ctime = START + day * 86400 + rng.randrange(86400)
+            start = ctime + rng.randrange(600)
+            walltime = rng.randrange(1, 7200)
+            end = start + walltime
+            nnodes = rng.randrange(1, 4)
+            ppn = rng.choice([1, 2, 4, 8])
+            hosts = '+'.join('%s/%d' % (n, s) for n in rng.sample(NODES, nnodes) for s in range(ppn))
+            job = '%d.master.cluster' % jobid
+            base = 'user=%s group=grp queue=%s ctime=%d qtime=%d etime=%d' % (user, queue, ctime, ctime, ctime)
+            records.append((ctime, '%s;Q;%s;queue=%s\n' % (timestamp(ctime), job, queue)))
+            if rng.random() < 0.05:
+                records.append((ctime + 5, '%s;D;%s;requestor=%s@login\n' % (timestamp(ctime + 5), job, user)))
+                continue
+            resources = 'exec_host=%s Resource_List.nodes=%d:ppn=%d' % (hosts, nnodes, ppn)
+            records.append((start, '%s;S;%s;%s start=%d owner=%s@login %s Resource_List.walltime=10:00:00 '
+                                   'total_execution_slots=%d unique_node_count=%d\n'
+                            % (timestamp(start), job, base, start, user, resources, nnodes * ppn, nnodes)))
+            records.append((end, '%s;E;%s;%s start=%d owner=%s@login %s Resource_List.mem=%dgb '
+                                 'Resource_List.walltime=10:00:00 session=%d total_execution_slots=%d '
+                                 'unique_node_count=%d end=%d Exit_status=%d resources_used.cput=%s '
+                                 'resources_used.mem=%dkb resources_used.vmem=%dkb resources_used.walltime=%s\n'
+                            % (timestamp(end), job, base, start, user, resources, rng.randrange(1, 64),
+                               rng.randrange(99999), nnodes * ppn, nnodes, end, rng.choice([0, 0, 0, 1, 271]),
+                               hms(walltime * nnodes * ppn * rng.randrange(10, 101) // 100),
+                               rng.randrange(10**6), rng.randrange(10**7), hms(walltime))))
+    records.sort(key=lambda r: r[0])
+    return records
+
+
+def accounting_lines(days, jobs_per_day=300, seed=1):
+    """returns the lines of days of jobs, in timestamp order
+    """
+    return [line for _, line in accounting_records(days, jobs_per_day, seed)]
+
+
+def write_accounting(directory, days, jobs_per_day=300, seed=1):
+    """writes days of jobs as daily accounting files YYYYMMDD in directory
+    and returns their paths
+    """
+    files = {}
+    for epoch, line in accounting_records(days, jobs_per_day, seed):
+        files.setdefault(time.strftime('%Y%m%d', time.gmtime(epoch)), []).append(line)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for name, lines in sorted(files.items()):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as accounting_fd:
+            accounting_fd.writelines(lines)
+        paths.append(path)
+    return paths
@@ -1,5 +1,8 @@
-from collections import Counter, defaultdict
+from collections import Counter
 from sys import argv
+import sys
+import struct
+import zipfile
 import csv
 import os
 import time
@@ -7,12 +10,88 @@ import calendar
 import glob
 import re
 import argparse
+import gzip
+import bz2
+import lzma
+import threading
+import queue
+import mmap
+import hashlib
+import pickle
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+import heapq
+from operator import itemgetter
+from functools import lru_cache
+from itertools import chain, repeat
+from contextlib import nullcontext
+
+# record types that do not describe a job: Licensing, Checkpointed and conTinued
+SKIPPED_TYPES = {'L', 'C', 'T'}
+
+# all accounting record types: Licensing, Queued, Started, Ended, Deleted,
+# Rerun, Aborted, Checkpointed and conTinued
+RECORD_TYPES = 'LQSEDRACT'
+
+# magic bytes at the start of compressed accounting files, and the modules
+# that decompress them
+COMPRESSIONS = ((b'\x1f\x8b', gzip), (b'BZh', bz2), (b'\xfd7zXZ\x00', lzma))
+# the file name suffixes of compressed (rotated) accounting files
+COMPRESSED_SUFFIXES = ('.gz', '.bz2', '.xz')
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# buffer size of the job csv file
+CSV_BUFFER = 1 << 20
+
+# the accounting properties Job.parse makes use of
+JOB_PROPERTIES = ('user', 'group', 'Exit_status', 'requestor', 'owner', 'queue',
+                  'ctime', 'qtime', 'etime', 'start', 'end', 'exec_host',
+                  'total_execution_slots', 'resources_used.cput',
+                  'resources_used.mem', 'resources_used.vmem', 'Resource_List.mem',
+                  'resources_used.walltime')
+
+
+class SymbolTable:
+    """This class interns names: every distinct name is stored once and gets
+    a small integer code, in the order in which the names are first seen
+    """
+    __slots__ = ('codes', 'names')
+
+    def __init__(self):
+        self.codes = {}
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def code(self, name):
+        """returns the integer code of name, adding it if it is new
+        """
+        c = self.codes.get(name)
+        if c is None:
+            c = self.codes[name] = len(self.names)
+            self.names.append(name)
+        return c
+
+    def intern(self, name):
+        """returns the stored copy of name, so that equal names share one string
+        """
+        return self.names[self.code(name)]
+
+
+# the node names of all exec_host strings
+NODES = SymbolTable()
+# the user, group, queue and owner names of all jobs
+NAMES = SymbolTable()
 
 
 class Users:
     """This class contains user information for billing purposes
     (cpu's x hours) and degree of parallelism (% used / requested)
     """
+    __slots__ = ('user', 'usedcpuseconds', 'reqcpuseconds')
+
     def __init__(self, user, usedcpuseconds, reqcpuseconds):
         self.user = user
         self.usedcpuseconds = usedcpuseconds
@@ -27,15 +106,30 @@ class Job:
     """This class contains all relevant information of a job processed
     by the Torque batch system, parsed from accounting information in
     $PBS_SPOOL/server_priv/accounting
+
+    The transition log, node usage and max coreslot dictionary are only
+    allocated when they are used: the transition log when keeplog is set,
+    the others when the job has an exec_host. The transition log holds the
+    timestamp and the status (character code) of every record of the job.
+
+    A lazy job only keeps the message of its latest record, which is parsed
+    by materialize() when the properties are needed. The max coreslots then
+    come from the exec_host of that record only.
     """
-    def __init__(self):
+    __slots__ = ('timestamp', 'jobid', 'user', 'group', 'status', 'transitions',
+                 'exitcode', 'owner', 'queue', 'ctime', 'qtime',
+                 'etime', 'start', 'end', 'nodes', 'reqcpus', 'reqnodes',
+                 'rucputime', 'rumemory', 'ruvmemory', 'reqmemory', 'ruwalltime',
+                 'usage', 'maxslot',
+                 'lazy', 'message')
+
+    def __init__(self, keeplog=False, lazy=False):
         self.timestamp = 0
         self.jobid = ''
         self.user = ''
         self.group = ''
         self.status = ''
-        self.statuslog = {}
-        self.statusstring = ''
+        self.transitions = array('q') if keeplog else None
         self.exitcode = 0
         self.owner = ''
         self.queue = ''
@@ -44,14 +138,18 @@ class Job:
         self.etime = 0
         self.start = 0
         self.end = 0
-        self.nodes = {}
+        self.nodes = None
         self.reqcpus = 0
         self.reqnodes = 0
         self.rucputime = '00:00:00'
-        self.rumemory = '0kb'
+        self.rumemory = 0
+        self.ruvmemory = 0
+        self.reqmemory = 0
         self.ruwalltime = '00:00:00'
-        self.usage = {}
-        self.maxslot = {}
+        self.usage = None
+        self.maxslot = None
+        self.lazy = lazy
+        self.message = None
 
     def update(self, entry):
         """decides whether the job needs to be updated with the information
@@ -59,9 +157,8 @@ class Job:
         be parsed.
         """
         # Register status
-        timestamp = entry[0]
-        self.statuslog[timestamp] = entry[1]
-        self.statusstring += entry[1]
+        if self.transitions is not None:
+            self.transitions.extend((entry[0], ord(entry[1])))
         # If the job already has exited, don't change anything.
         if self.status == 'E':
             return
@@ -75,76 +172,82 @@ class Job:
 
     def parse(self, entry):
         """parses the accounting line entry for properties and sets member
-        variables accordingly
+        variables accordingly. The entry can also be a record whose message
+        has already been split into properties (see parse_records)
         """
         message = ''
         try:
             self.timestamp = entry[0]
             self.status = entry[1]
             self.jobid = entry[2]
-            message = ''.join(entry[3:])
+            message = entry[3] if len(entry) == 4 and type(entry[3]) is dict else ''.join(entry[3:])
         except IndexError:
             print("Too few entries in job line!")
 
-        # these are the properties of each job entry
-        # the regexp matches all nonwhitespace characters before an equal sign
-        props = re.findall(r"\S*=", message)
-        vals = re.split(r"\S*=", message)
+        if self.lazy:
+            # keep the message, until materialize() needs the properties
+            self.message = message
+            return
+        self.parse_message(message)
 
-        # make sure the lists do not contain a ''
-        props = list(filter(None, props))
-        vals = list(filter(None, vals))
-        
-        # remove equal signs
-        prop = list(i[:-1] for i in props)
-        # clear trailing spaces
-        val = list(i.rstrip() for i in vals)
-        # make a dictionary
-        jobdict = dict(zip(prop, val))
-
-        self.user = jobdict.get('user', '')
-        self.group = jobdict.get('group', '')
+    def materialize(self):
+        """parses the message kept by a lazy job, if it has not been parsed yet
+        """
+        if self.message is not None:
+            message, self.message = self.message, None
+            self.parse_message(message)
+
+    def parse_message(self, message):
+        """sets the member variables from the properties in the message of an
+        accounting line, or from a dictionary with those properties
+        """
+        # split the message into its key=value properties in a single pass
+        jobdict = message if type(message) is dict else parse_properties(message)
+
+        # the names repeat over many jobs, so they are interned
+        self.user = NAMES.intern(jobdict.get('user', ''))
+        self.group = NAMES.intern(jobdict.get('group', ''))
         self.exitcode = jobdict.get('Exit_status', 0)
         if self.status == 'D':
             # deleted jobs don't have an owner but a requestor
-            self.owner = jobdict.get('requestor', '')
+            self.owner = NAMES.intern(jobdict.get('requestor', ''))
         else:
-            self.owner = jobdict.get('owner', '')
-        self.queue = jobdict.get('queue', '')
+            self.owner = NAMES.intern(jobdict.get('owner', ''))
+        self.queue = NAMES.intern(jobdict.get('queue', ''))
         self.ctime = jobdict.get('ctime', 0)
         self.qtime = jobdict.get('qtime', 0)
         self.etime = jobdict.get('etime', 0)
         self.start = jobdict.get('start', 0)
         self.end = jobdict.get('end', 0)
         
-        # This parses the nodestring for allocated core-slots on nodes
-        nodes = jobdict.get('exec_host', '')
-        # the regexp splits on any '/' or any '+' character
-        nodes = re.split('[/+]', nodes)
-        # make sure the list does not contain a ''
-        nodes = list(filter(None, nodes))
-        # count the dictionary occurences for each individual node,
-        # leaving you with a new dict with entries: 'nodename' = #ofcores
-        # note: the even indices have the nodenames, the odd have the coreslots
-        self.nodes = Counter(nodes[::2])
-
-        # determine the max coreslot for each node allocated to this job
+        # This parses the nodestring for allocated core-slots on nodes, giving
+        # a dict with entries: 'nodename' = #ofcores, and the max coreslot for
+        # each node allocated to this job
+        cores, slots = decode_exec_host(jobdict.get('exec_host', ''))
+        self.nodes = cores if cores else None
+
+        # keep the max coreslot for each node over all records of this job
         # this is used when there is no 'nodes' list available
-        for i, n in enumerate(nodes[::2]):
-            if n in self.maxslot:
-                self.maxslot[n] = max(self.maxslot[n], int(nodes[2*i+1]))
+        if slots:
+            if self.maxslot is None:
+                self.maxslot = slots
             else:
-                self.maxslot[n] = int(nodes[2*i+1])
+                for n, v in slots.items():
+                    if v > self.maxslot.get(n, -1):
+                        self.maxslot[n] = v
 
         self.reqcpus = int(jobdict.get('total_execution_slots', 0))
         # self.reqnodes = jobdict.get('unique_node_count', 0)
-        self.reqnodes = len(self.nodes)
+        self.reqnodes = len(self.nodes) if self.nodes else 0
         
         self.rucputime = hms2sec(jobdict.get('resources_used.cput', '00:00:00'))
-        self.rumemory = int(jobdict.get('resources_used.mem', '0kb').rstrip('kb'))
+        # memory sizes in bytes
+        self.rumemory = mem2bytes(jobdict.get('resources_used.mem', '0'))
+        self.ruvmemory = mem2bytes(jobdict.get('resources_used.vmem', '0'))
+        self.reqmemory = mem2bytes(jobdict.get('Resource_List.mem', '0'))
         self.ruwalltime = hms2sec(jobdict.get('resources_used.walltime', '00:00:00'))
         
-        if self.status == 'E':
+        if self.status == 'E' and self.nodes:
             # upon exit, when used resources are known, compute node usage by
             # calculating walltime x #ofcores since that is what the system has
             # reserved
@@ -152,14 +255,468 @@ class Job:
             for k in self.nodes:
                 self.usage[k] = self.nodes[k] * self.ruwalltime
 
+    def prepare_transitions(self):
+        """lists the transitions of the job as csv rows of jobid, timestamp
+        and status
+        """
+        t = self.transitions or ()
+        return [[self.jobid, t[i], chr(t[i + 1])] for i in range(0, len(t), 2)]
+
     def prepare_csv(self):
-        """creates a string of member variables to be written out as csv
+        """creates a tuple of member variables to be written out as csv
         """
-        return [self.timestamp, self.jobid,
+        self.materialize()
+        return (self.timestamp, self.jobid,
                 self.owner if self.status == 'D' else self.user, self.status,
                 self.exitcode, self.queue, self.qtime, self.start,
                 self.end, self.reqnodes, self.reqcpus, self.rucputime,
-                self.rumemory, self.ruwalltime]
+                self.rumemory // 1024, self.ruwalltime)
+
+
+class Totals:
+    """This class accumulates the node usage and user billing totals over the
+    jobs folded into it, so that jobs can be dropped once they are added.
+    For the memory efficiency, the number of ended jobs that requested memory,
+    their used and their requested bytes are summed per (user, queue).
+    """
+    def __init__(self):
+        self.nodeusage = Counter()
+        self.nodecpus = {}
+        self.users = {}
+        self.memory = {}
+        self.first = None
+        self.last = None
+
+    def add(self, job):
+        """folds the resources of a job into the totals
+        """
+        job.materialize()
+        # node usage as a total of requested cores x walltime in seconds
+        if job.usage:
+            self.nodeusage.update(job.usage)
+        # best guess of the number of cores per node from the maximum core #
+        if job.maxslot:
+            for k, v in job.maxslot.items():
+                self.nodecpus[k] = max(self.nodecpus.get(k, 0), v + 1)
+        # actual cpuseconds used, and requested cpu times the walltime used
+        # is the user field filled in? If not, then it's most likely an array job.
+        if job.user:
+            if job.user not in self.users:
+                self.users[job.user] = Users(job.user, job.rucputime, job.reqcpus * job.ruwalltime)
+            else:
+                self.users[job.user].update(job.rucputime, job.reqcpus * job.ruwalltime)
+        # used vs requested memory of ended jobs
+        if job.user and job.status == 'E' and job.reqmemory:
+            m = self.memory.setdefault((job.user, job.queue), [0, 0, 0])
+            m[0] += 1
+            m[1] += job.rumemory
+            m[2] += job.reqmemory
+        # first and last timestamp, for the length of the logging period
+        if self.first is None or job.timestamp < self.first:
+            self.first = job.timestamp
+        if self.last is None or job.timestamp > self.last:
+            self.last = job.timestamp
+
+    def merge(self, other):
+        """folds the totals of another Totals object (e.g. the partial totals
+        of a single accounting file) into these totals
+        """
+        self.nodeusage.update(other.nodeusage)
+        for k, v in other.nodecpus.items():
+            self.nodecpus[k] = max(self.nodecpus.get(k, 0), v)
+        for k, u in other.users.items():
+            if k not in self.users:
+                self.users[k] = Users(k, u.usedcpuseconds, u.reqcpuseconds)
+            else:
+                self.users[k].update(u.usedcpuseconds, u.reqcpuseconds)
+        for k, v in other.memory.items():
+            m = self.memory.setdefault(k, [0, 0, 0])
+            for i in range(3):
+                m[i] += v[i]
+        if other.first is not None and (self.first is None or other.first < self.first):
+            self.first = other.first
+        if other.last is not None and (self.last is None or other.last > self.last):
+            self.last = other.last
+
+
+class JobTable:
+    """This class holds jobs column by column instead of as Job objects:
+    fixed width integer arrays for the times and used resources, and integer
+    codes into a list of names for the user, group, queue, owner and status.
+    The nodes of each job are kept in separate columns, indexed by the row of
+    the job, so that the node and user totals are sums over whole columns.
+    The table is built for the .npz export, which then takes its totals from it.
+    """
+    INTCOLUMNS = ('timestamp', 'exitcode', 'ctime', 'qtime', 'etime', 'start', 'end',
+                  'reqcpus', 'reqnodes', 'rucputime', 'rumemory', 'ruvmemory', 'reqmemory',
+                  'ruwalltime')
+    CATEGORIES = ('user', 'group', 'queue', 'owner', 'status')
+
+    def __init__(self):
+        self.jobid = []
+        self.columns = {c: array('q') for c in self.INTCOLUMNS}
+        self.columns.update({c: array('l') for c in self.CATEGORIES})
+        # names and their codes, for the categories and the node names. The node
+        # codes are those of NODES, in which decode_exec_host interns the names
+        self.symbols = {c: SymbolTable() for c in self.CATEGORIES}
+        self.symbols['node'] = NODES
+        # one row per node of a job: job row, node code, #cores and max coreslot
+        self.nodejob = array('l')
+        self.nodecode = array('l')
+        self.nodecores = array('l')
+        self.nodemaxslot = array('l')
+
+    def __len__(self):
+        return len(self.jobid)
+
+    def code(self, category, name):
+        """returns the integer code of name in category, adding it if it is new
+        """
+        return self.symbols[category].code(name)
+
+    def append(self, job):
+        """adds a job as a new row to the table
+        """
+        job.materialize()
+        row = len(self.jobid)
+        self.jobid.append(job.jobid)
+        for c in self.INTCOLUMNS:
+            self.columns[c].append(int(getattr(job, c)))
+        for c in self.CATEGORIES:
+            self.columns[c].append(self.code(c, getattr(job, c)))
+        # the max coreslots cover every node the job has been allocated to
+        if job.maxslot:
+            for n, v in job.maxslot.items():
+                self.nodejob.append(row)
+                self.nodecode.append(self.code('node', n))
+                self.nodecores.append(job.nodes.get(n, 0) if job.nodes else 0)
+                self.nodemaxslot.append(v)
+
+    @classmethod
+    def from_jobs(cls, jobs):
+        """builds a table from an iterable of jobs
+        """
+        table = cls()
+        for job in jobs:
+            table.append(job)
+        return table
+
+    def totals(self, totals=None):
+        """folds the node usage and user billing of all jobs in the table into
+        totals (a new Totals object when None) and returns it
+        """
+        if totals is None:
+            totals = Totals()
+        if not len(self):
+            return totals
+        col = self.columns
+
+        timestamps = col['timestamp']
+        first, last = min(timestamps), max(timestamps)
+        totals.first = first if totals.first is None else min(totals.first, first)
+        totals.last = last if totals.last is None else max(totals.last, last)
+
+        # group the used and requested cpuseconds by user code
+        users = self.symbols['user'].names
+        used = [0] * len(users)
+        req = [0] * len(users)
+        for u, cpu, ncpu, wall in zip(col['user'], col['rucputime'], col['reqcpus'], col['ruwalltime']):
+            used[u] += cpu
+            req[u] += ncpu * wall
+        for u, name in enumerate(users):
+            # is the user field filled in? If not, then it's most likely an array job.
+            if not name:
+                continue
+            if name not in totals.users:
+                totals.users[name] = Users(name, used[u], req[u])
+            else:
+                totals.users[name].update(used[u], req[u])
+
+        # group the used and requested memory of ended jobs by (user, queue)
+        ended = self.symbols['status'].codes.get('E')
+        status = col['status']
+        memory = {}
+        for u, q, st, rumem, reqmem in zip(col['user'], col['queue'], status, col['rumemory'], col['reqmemory']):
+            if reqmem and st == ended:
+                m = memory.setdefault((u, q), [0, 0, 0])
+                m[0] += 1
+                m[1] += rumem
+                m[2] += reqmem
+        queues = self.symbols['queue'].names
+        for (u, q), v in memory.items():
+            # is the user field filled in? If not, then it's most likely an array job.
+            if users[u]:
+                m = totals.memory.setdefault((users[u], queues[q]), [0, 0, 0])
+                for i in range(3):
+                    m[i] += v[i]
+
+        # group the node usage of ended jobs and the max coreslot by node code
+        walltime = col['ruwalltime']
+        usage = {}
+        names = self.symbols['node'].names
+        maxslot = [-1] * len(names)
+        for j, n, cores, v in zip(self.nodejob, self.nodecode, self.nodecores, self.nodemaxslot):
+            if cores and status[j] == ended:
+                usage[n] = usage.get(n, 0) + cores * walltime[j]
+            if v > maxslot[n]:
+                maxslot[n] = v
+        for n, u in usage.items():
+            totals.nodeusage[names[n]] += u
+        for n, v in enumerate(maxslot):
+            # NODES also holds nodes without jobs in this table
+            if v >= 0:
+                totals.nodecpus[names[n]] = max(totals.nodecpus.get(names[n], 0), v + 1)
+        return totals
+
+
+class DecompressedLines:
+    """This class iterates the lines of a compressed file, which is read and
+    decompressed in a background thread so that decompressing and parsing
+    overlap. It can be used like a file object opened for reading text.
+    The thread reads ahead at most two chunks of chunksize bytes.
+    """
+    def __init__(self, fileobj, chunksize=1 << 18):
+        self.fileobj = fileobj
+        self.chunksize = chunksize
+        self.chunks = queue.Queue(maxsize=2)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._decompress, daemon=True)
+        self.thread.start()
+
+    def _decompress(self):
+        """reads decompressed chunks into the queue, an empty chunk at the end.
+        Errors are passed on through the queue as well
+        """
+        try:
+            while not self.stopped.is_set():
+                chunk = self.fileobj.read(self.chunksize)
+                self._put(chunk)
+                if not chunk:
+                    break
+        except Exception as e:
+            self._put(e)
+
+    def _put(self, item):
+        # don't block forever when the reader has stopped reading
+        while not self.stopped.is_set():
+            try:
+                self.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        partial = b''
+        while True:
+            chunk = self.chunks.get()
+            if isinstance(chunk, Exception):
+                raise chunk
+            if not chunk:
+                break
+            data = partial + chunk
+            # only decode complete lines, a multibyte character could be split
+            end = data.rfind(b'\n') + 1
+            partial = data[end:]
+            yield from split_lines(data[:end].decode())
+        if partial:
+            yield partial.decode()
+
+    def close(self):
+        self.stopped.set()
+        self.thread.join()
+        self.fileobj.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CompressedWriter:
+    """This class writes text to a gzip compressed file, which is compressed
+    and written in a background thread so that formatting and compressing
+    overlap. It can be used like a file object opened for writing text.
+    The fastest compression level is the default: it is several times faster
+    than level 6 for csv files that are only slightly larger.
+    """
+    def __init__(self, filename, mode='w', chunksize=1 << 20, compresslevel=1):
+        self.fileobj = gzip.open(filename, mode.replace('t', '') + 'b', compresslevel)
+        self.chunksize = chunksize
+        self.pending = []
+        self.size = 0
+        self.error = None
+        self.chunks = queue.Queue(maxsize=8)
+        self.thread = threading.Thread(target=self._compress, daemon=True)
+        self.thread.start()
+
+    def _compress(self):
+        """compresses the chunks in the queue until None. After an error the
+        chunks are dropped, the error is raised by the writing thread
+        """
+        while True:
+            chunk = self.chunks.get()
+            try:
+                if chunk is None:
+                    break
+                if self.error is None:
+                    self.fileobj.write(chunk)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.chunks.task_done()
+
+    def _send(self):
+        if self.error is not None:
+            raise self.error
+        if self.pending:
+            self.chunks.put(''.join(self.pending).encode())
+            self.pending.clear()
+            self.size = 0
+
+    def write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= self.chunksize:
+            self._send()
+        return len(text)
+
+    def writelines(self, lines):
+        self.write(''.join(lines))
+
+    def flush(self):
+        """compresses and writes out everything written so far
+        """
+        self._send()
+        self.chunks.join()
+        if self.error is not None:
+            raise self.error
+        self.fileobj.flush()
+
+    def close(self):
+        if self.thread.is_alive():
+            self._send()
+            self.chunks.put(None)
+            self.thread.join()
+        self.fileobj.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class JobWriter:
+    """This class writes the rows of the job csv file in chunks: every row is
+    formatted with a single format string, and a chunk of lines is written at
+    once. Rows with a field that needs quoting (a comma, double quote, carriage
+    return or newline) are left to the csv module, so that the output is the
+    same as that of csv.writer. flush() writes out the last chunk.
+    """
+    def __init__(self, csv_fd, chunksize=4096):
+        self.csv_fd = csv_fd
+        self.csv_file = csv.writer(csv_fd)
+        self.chunksize = chunksize
+        self.chunk = []
+        self.ncolumns = len(header_csv())
+        self.line = ','.join(['%s'] * self.ncolumns)
+
+    def _write_chunk(self):
+        if self.chunk:
+            self.chunk.append('')
+            self.csv_fd.write('\r\n'.join(self.chunk))
+            self.chunk.clear()
+
+    def writerow(self, row):
+        line = self.line % tuple(row)
+        if (line.count(',') == self.ncolumns - 1 and '"' not in line
+                and '\n' not in line and '\r' not in line):
+            self.chunk.append(line)
+            if len(self.chunk) >= self.chunksize:
+                self._write_chunk()
+        else:
+            # keep the order of the rows
+            self._write_chunk()
+            self.csv_file.writerow(row)
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def flush(self):
+        self._write_chunk()
+        self.csv_fd.flush()
+
+
+class JobDatabase:
+    """This class loads jobs into an SQLite database, so that questions about
+    a user, queue, node or period are index lookups instead of a reparse of
+    the accounting files. The jobs table has the columns of the job csv file
+    and the user, job_nodes has a row for every node of a job, and users is a
+    view with the billing of each user. Loading a job again replaces it.
+    Jobs are inserted with executemany, a chunk per transaction. The chunk
+    holds the rows by jobid, so a job added twice is inserted once.
+    """
+    def __init__(self, filename, chunksize=10000):
+        self.connection = sqlite3.connect(filename)
+        self.chunksize = chunksize
+        self.jobs = {}
+        self.nodes = {}
+        self.columns = [re.sub(r'\W+', '_', c).strip('_') for c in header_csv()] + ['user']
+        types = {'jobid': 'TEXT PRIMARY KEY', 'owner': 'TEXT', 'status': 'TEXT',
+                 'queue': 'TEXT', 'user': 'TEXT'}
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS jobs (%s);
+            CREATE INDEX IF NOT EXISTS jobs_timestamp ON jobs (timestamp);
+            CREATE INDEX IF NOT EXISTS jobs_user ON jobs (user);
+            CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (queue);
+            CREATE TABLE IF NOT EXISTS job_nodes (
+                jobid TEXT, node TEXT, cores INTEGER, maxslot INTEGER, cpuseconds INTEGER,
+                PRIMARY KEY (jobid, node));
+            CREATE INDEX IF NOT EXISTS job_nodes_node ON job_nodes (node);
+            CREATE VIEW IF NOT EXISTS users AS
+                SELECT user, sum(used_cputime) AS used_cpuseconds,
+                       sum(cores * used_walltime) AS req_cpuseconds
+                FROM jobs WHERE user != '' GROUP BY user;
+            ''' % ', '.join(c + ' ' + types.get(c, 'INTEGER') for c in self.columns))
+        self.insert = 'INSERT OR REPLACE INTO jobs VALUES (%s)' % ', '.join('?' * len(self.columns))
+
+    def add(self, job):
+        """adds a job to the current chunk, replacing the rows of an earlier
+        record of the job in the chunk, and inserts the chunk when it is full
+        """
+        self.jobs[job.jobid] = job.prepare_csv() + (job.user,)
+        self.nodes[job.jobid] = [(job.jobid, n, job.nodes.get(n, 0) if job.nodes else 0, v,
+                                  job.usage.get(n, 0) if job.usage else 0)
+                                 for n, v in (job.maxslot.items() if job.maxslot else ())]
+        if len(self.jobs) >= self.chunksize:
+            self.flush()
+
+    def flush(self):
+        """inserts the current chunk of jobs and their nodes in one transaction
+        """
+        with self.connection:
+            # the nodes of a job loaded before may have changed
+            self.connection.executemany('DELETE FROM job_nodes WHERE jobid = ?',
+                                        ((jobid,) for jobid in self.jobs))
+            self.connection.executemany(self.insert, self.jobs.values())
+            self.connection.executemany('INSERT INTO job_nodes VALUES (?, ?, ?, ?, ?)',
+                                        chain.from_iterable(self.nodes.values()))
+        self.jobs.clear()
+        self.nodes.clear()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
 
 def header_csv():
@@ -170,6 +727,18 @@ def header_csv():
             'used_cputime', 'used_memory(kb)', 'used_walltime']
 
 
+def header_transitions_csv():
+    """lists the header string for the transitions csv file
+    """
+    return ['jobid', 'timestamp', 'status']
+
+
+def header_memory_csv():
+    """lists the header string for the memory csv file
+    """
+    return ['user', 'queue', '#jobs', 'used_memory(gb)', 'req_memory(gb)', 'pct_memory']
+
+
 def header_nodes_csv():
     """lists the header string for users csv file
     """
@@ -182,10 +751,130 @@ def header_users_csv():
     return ['user', 'used_cpuhours', 'req_cpus*walltimehours', 'pct_parallel']
 
 
+def parse_properties(message):
+    """splits an accounting message into a dictionary of key=value properties
+    in a single pass. A whitespace separated token containing an equal sign
+    starts a new property, the key being everything up to the first equal sign
+    (e.g. 'Resource_List.nodes=2:ppn=4' gives key 'Resource_List.nodes' with
+    value '2:ppn=4'). Tokens without an equal sign are appended to the value of the previous key.
+    """
+    props = {}
+    key = None
+    for token in message.split():
+        eq = token.find('=')
+        if eq >= 0:
+            key = token[:eq]
+            props[key] = token[eq + 1:]
+        elif key is not None:
+            props[key] += ' ' + token
+    return props
+
+
+def count_slots(slots):
+    """counts the core slots in an exec_host slot list such as '3', '0-15' or
+    '0,2,4-7' from the bounds of the ranges, without expanding them. Returns
+    the number of slots and the highest slot. Raises ValueError for a slot
+    that is not a number and for a range that ends below its start.
+    """
+    if not slots:
+        return 1, 0
+    count = 0
+    top = 0
+    for item in slots.split(','):
+        first, _, last = item.partition('-')
+        if last:
+            first, last = int(first), int(last)
+            if last < first:
+                raise ValueError("invalid exec_host slot range: %r" % item)
+            count += last - first + 1
+            top = max(top, last)
+        else:
+            count += 1
+            top = max(top, int(first))
+    return count, top
+
+
+def decode_exec_host(exec_host, nodes=NODES):
+    """decodes an exec_host string into two dictionaries holding the number of
+    core slots and the max coreslot of every node, in a single pass. Both the
+    expanded form 'node01/0+node01/1' and the slot lists of newer Torque
+    versions 'node01/0-15+node02/0,2,4-7' are handled (see count_slots).
+    The node names are interned in the symbol table nodes.
+    """
+    cores = {}
+    maxslot = {}
+    for part in exec_host.split('+'):
+        name, _, slot = part.partition('/')
+        if not name:
+            continue
+        name = nodes.intern(name)
+        if slot.isdigit():
+            count = 1
+            top = int(slot)
+        else:
+            count, top = count_slots(slot)
+        cores[name] = cores.get(name, 0) + count
+        if top > maxslot.get(name, -1):
+            maxslot[name] = top
+    return cores, maxslot
+
+
+# the seconds in each field of a duration, by its number of colons
+DURATION_WEIGHTS = {0: (1,), 1: (60, 1), 2: (3600, 60, 1), 3: (86400, 3600, 60, 1)}
+
+
 def hms2sec(hms):
-    """quick oneliner for converting HH:MM:SS into seconds
+    """converts a duration HH:MM:SS, D:HH:MM:SS, MM:SS or plain seconds
+    into seconds
+    """
+    fields = hms.split(':')
+    if len(fields) == 3:
+        return int(fields[0]) * 3600 + int(fields[1]) * 60 + int(fields[2])
+    weights = DURATION_WEIGHTS.get(len(fields) - 1)
+    if weights is None:
+        raise ValueError("invalid duration: %r" % hms)
+    return sum(w * int(x) for w, x in zip(weights, fields))
+
+
+# the multipliers of the memory size units, sizes in words are 8 bytes each
+MEMORY_UNITS = {'': 1, 'k': 2**10, 'm': 2**20, 'g': 2**30, 't': 2**40, 'p': 2**50}
+MEMORY_SIZE = re.compile(r'(\d+)([kmgtp]?)([bw]?)$')
+
+
+def mem2bytes(mem):
+    """converts a memory size such as '1234kb', '16gb', '512mw' or '100b'
+    (or a plain number of bytes) into bytes. An empty size is 0 bytes, other
+    sizes that are not understood raise ValueError.
+    """
+    mem = mem.strip().lower()
+    if not mem:
+        return 0
+    match = MEMORY_SIZE.match(mem)
+    if match is None:
+        raise ValueError("invalid memory size: %r" % mem)
+    digits, unit, word = match.groups()
+    size = int(digits) * MEMORY_UNITS[unit]
+    return 8 * size if word == 'w' else size
+
+
+@lru_cache(maxsize=1024)
+def midnight_epoch(date):
+    """converts an accounting date MM/DD/YYYY into the epoch of its midnight
+    (UTC). Accounting files hold one day each, so this is cached per date.
     """
-    return sum(int(x) * 60 ** i for i, x in enumerate(reversed(hms.split(':'))))
+    return calendar.timegm(time.strptime(date, "%m/%d/%Y"))
+
+
+def timestamp2epoch(timestamp):
+    """converts an accounting timestamp 'MM/DD/YYYY HH:MM:SS' into epoch
+    seconds (UTC), adding the time of day to the cached midnight epoch
+    """
+    hours, minutes, seconds = timestamp[11:13], timestamp[14:16], timestamp[17:19]
+    if (len(timestamp) != 19 or timestamp[10] != ' ' or timestamp[13] != ':' or timestamp[16] != ':'
+            or not (hours + minutes + seconds).isdigit()
+            or int(hours) > 23 or int(minutes) > 59 or int(seconds) > 59):
+        raise ValueError("invalid accounting timestamp: %r" % timestamp)
+    return midnight_epoch(timestamp[:10]) + int(hours) * 3600 + int(minutes) * 60 + int(seconds)
 
 
 def epoch_interval(start, end):
@@ -197,6 +886,573 @@ def epoch_interval(start, end):
     return (end_next - end_next % 86400) - (start - start % 86400)
 
 
+def node_report(totals, nodecpus):
+    """lists the node usage in totals as rows of node, #cores, cpuhours and
+    the load percentage of the number of cores in nodecpus over the logging
+    period, sorted on node name
+    """
+    sortednodeusage = dict(sorted(totals.nodeusage.items(), key=lambda item: item[0]))
+
+    # compute the time interval over all accounting files in seconds
+    loginterval = epoch_interval(totals.first, totals.last)
+
+    rows = []
+    for i in sortednodeusage:
+        snu = sortednodeusage[i]
+        ncpu = nodecpus[i]
+        rows.append([i, ncpu, snu / 3600, 100 * snu/(ncpu * loginterval) if ncpu * loginterval > 0 else 0])
+    return rows
+
+
+def user_report(totals):
+    """lists the user billing in totals as rows of user, used and requested
+    cpuhours and the percentage of parallelization, largest consumers first
+    """
+    # ties in alphabetical order
+    sorteduser = dict(sorted(totals.users.items(), key=lambda item: (-item[1].usedcpuseconds, item[0])))
+
+    rows = []
+    for k in sorteduser:
+        assert(k == sorteduser[k].user)
+        u = sorteduser[k].usedcpuseconds
+        r = sorteduser[k].reqcpuseconds
+        rows.append([k, u/3600, r/3600, 100 * u/r if r > 0 else 0])
+    return rows
+
+
+def memory_report(totals):
+    """lists the memory efficiency in totals as rows of user, queue, #jobs,
+    used and requested memory in gb and the percentage used
+    """
+    return [[user, queue, njobs, used / 2**30, req / 2**30, 100 * used / req]
+            for (user, queue), (njobs, used, req) in sorted(totals.memory.items())]
+
+
+def write_nodes_csv(filename, totals, nodecpus, compress=False):
+    """writes the node usage in totals to a csv file, as a load percentage of
+    the number of cores in nodecpus over the logging period
+    """
+    with open_output(filename, compress=compress) as csv_fd:
+        csv_file = csv.writer(csv_fd)
+        csv_file.writerow(header_nodes_csv())
+        csv_file.writerows([x if type(x) is str or type(x) is int else format(x, '.2f') for x in nodeload]
+                           for nodeload in node_report(totals, nodecpus))
+
+
+def write_users_csv(filename, totals, compress=False):
+    """writes the user billing in totals to a csv file, converting cpuseconds
+    to cpuhours and calculating the percentage of parallelization
+    """
+    with open_output(filename, compress=compress) as csv_fd:
+        csv_file = csv.writer(csv_fd)
+        csv_file.writerow(header_users_csv())
+        csv_file.writerows([x if type(x) is str else format(x, '.2f') for x in billing]
+                           for billing in user_report(totals))
+
+
+def read_nodes(directory):
+    """obtains the number of cores of each node from the nodes file in the
+    torque directory
+    """
+    nodecpus = {}
+    with open(directory + '/server_priv/nodes', 'r') as node_fd:
+        for line in node_fd:
+            node = re.split(r"\snp=|\s", line)
+            node = list(filter(None, node))[:2]
+            nodecpus[node[0]] = int(node[1])
+    return nodecpus
+
+
+def write_memory_csv(filename, totals, compress=False):
+    """writes the memory efficiency in totals to a csv file: the memory used
+    by the ended jobs of each user in each queue as a percentage of the memory
+    they requested
+    """
+    with open_output(filename, compress=compress) as csv_fd:
+        csv_file = csv.writer(csv_fd)
+        csv_file.writerow(header_memory_csv())
+        csv_file.writerows([x if type(x) is str or type(x) is int else format(x, '.2f') for x in efficiency]
+                           for efficiency in memory_report(totals))
+
+
+def npy_bytes(values, typecode):
+    """encodes a column as a NumPy .npy file: typecode is an array typecode
+    ('q' for integers, 'd' for floats) or 'U' for strings
+    """
+    values = list(values)
+    if typecode == 'U':
+        width = max(map(len, values), default=0) or 1
+        descr = '<U%d' % width
+        data = ''.join(v.ljust(width, '\0') for v in values).encode('utf-32-le')
+    else:
+        column = array(typecode, values)
+        descr = ('<' if sys.byteorder == 'little' else '>') + {'q': 'i8', 'd': 'f8'}[typecode]
+        data = column.tobytes()
+    header = "{'descr': '%s', 'fortran_order': False, 'shape': (%d,), }" % (descr, len(values))
+    # the header is padded so that the data starts on a 64 byte boundary
+    header += ' ' * (63 - (10 + len(header)) % 64) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1') + data
+
+
+def write_npz(filename, columns):
+    """writes columns, a dictionary name: (typecode, values), as a compressed
+    NumPy .npz archive, which numpy.load reads without any parsing. Writing it
+    does not need NumPy.
+    """
+    with zipfile.ZipFile(filename, 'w', zipfile.ZIP_DEFLATED) as npz:
+        for name, (typecode, values) in columns.items():
+            npz.writestr(name + '.npy', npy_bytes(values, typecode))
+
+
+def report_columns(table, rows, header, typecodes):
+    """adds the columns of the report rows, named after the header, to the
+    dictionary of columns of table
+    """
+    for i, (name, typecode) in enumerate(zip(header, typecodes)):
+        table[name] = (typecode, [row[i] for row in rows])
+
+
+def write_reports(outputname, totals, nodecpus, memory=False, formats=('csv',), jobs=None, compress=False):
+    """writes the node and user reports of the totals, and the memory report
+    if memory is set. nodecpus holds the number of cores of each node from the
+    nodes file, if any. The reports are written as csv files and/or, together
+    with the JobTable jobs, as columns in a NumPy .npz file, depending on
+    formats. With compress, the csv files are gzip compressed.
+    """
+    # if the nodes files is missing, or if it is incomplete
+    # use the best guess from the maximum core # per node
+    nodecpus = dict(nodecpus)
+    for k, v in totals.nodecpus.items():
+        nodecpus[k] = max(nodecpus.get(k, 0), v)
+
+    if 'csv' in formats:
+        write_nodes_csv(outputname + '.nodes.csv', totals, nodecpus, compress)
+        write_users_csv(outputname + '.users.csv', totals, compress)
+        if memory:
+            write_memory_csv(outputname + '.memory.csv', totals, compress)
+
+    if 'npz' in formats:
+        columns = {}
+        if jobs is not None:
+            columns['jobs.jobid'] = ('U', jobs.jobid)
+            for c in jobs.INTCOLUMNS + jobs.CATEGORIES:
+                columns['jobs.' + c] = ('q', jobs.columns[c])
+            for c, symbols in jobs.symbols.items():
+                columns['jobs.' + c + '_names'] = ('U', symbols.names)
+            for c in ('nodejob', 'nodecode', 'nodecores', 'nodemaxslot'):
+                columns['jobs.' + c] = ('q', getattr(jobs, c))
+        report_columns(columns, node_report(totals, nodecpus),
+                       ['nodes.node', 'nodes.cores', 'nodes.cpuhours', 'nodes.pct_load'], 'Uqdd')
+        report_columns(columns, user_report(totals),
+                       ['users.user', 'users.used_cpuhours', 'users.req_cpuhours', 'users.pct_parallel'], 'Uddd')
+        if memory:
+            report_columns(columns, memory_report(totals),
+                           ['memory.user', 'memory.queue', 'memory.jobs', 'memory.used_gb',
+                            'memory.req_gb', 'memory.pct_memory'], 'UUqddd')
+        write_npz(outputname + '.npz', columns)
+
+
+def split_lines(text):
+    """splits text into lines (keeping the line ends) like iterating a file
+    opened for reading text does: at '\\n', '\\r\\n' and '\\r', which become
+    '\\n'. Unlike str.splitlines, other control characters such as '\\x1c'
+    do not end a line.
+    """
+    lines = text.replace('\r\n', '\n').replace('\r', '\n').split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def compression(filename):
+    """returns the module decompressing the file (gzip, bz2 or lzma) as
+    detected by its magic bytes, or None when it is not compressed
+    """
+    with open(filename, 'rb') as magic_fd:
+        magic = magic_fd.read(6)
+    for prefix, module in COMPRESSIONS:
+        if magic.startswith(prefix):
+            return module
+    if magic.startswith(ZSTD_MAGIC):
+        raise ValueError(filename + ": zstd compressed files are not supported, decompress it first")
+    return None
+
+
+def open_binary(filename):
+    """opens a (possibly compressed) accounting file for reading bytes
+    """
+    module = compression(filename)
+    return module.open(filename, 'rb') if module else open(filename, 'rb')
+
+
+def open_accounting(filename, threaded=True):
+    """opens a (possibly compressed) accounting file for reading lines of text.
+    Compressed files are decompressed in a background thread, or while reading
+    when threaded is False (when many files are read at the same time).
+    """
+    module = compression(filename)
+    if module is None:
+        return open(filename, 'r')
+    if threaded:
+        return DecompressedLines(module.open(filename, 'rb'))
+    return module.open(filename, 'rt')
+
+
+def open_output(filename, mode='w', compress=False):
+    """opens an output csv file for writing text. With compress, the file
+    gets a .gz suffix and is gzip compressed in a background thread.
+    """
+    if compress:
+        return CompressedWriter(filename + '.gz', mode)
+    return open(filename, mode, buffering=CSV_BUFFER)
+
+
+def filter_records(lines, types):
+    """first stage of the ingest pipeline: passes on the raw accounting lines
+    whose record type is in types, or every line when types is None.
+    The record type is the field following the timestamp, so the rest of the
+    line is not looked at for records that are discarded.
+    """
+    if types is None:
+        yield from lines
+        return
+    for line in lines:
+        if line.partition(';')[2][:1] in types:
+            yield line
+
+
+def split_records(lines):
+    """second stage of the ingest pipeline: splits the accounting lines into
+    their fields and converts the timestamp into epoch seconds
+    """
+    for line in lines:
+        entry = line.split(';')
+        entry[0] = timestamp2epoch(entry[0])
+        yield entry
+
+
+def parse_records(entries):
+    """third (optional) stage of the ingest pipeline: turns the entries into
+    records (timestamp, type, jobid, properties) with the message already
+    split into its properties. Only the properties in JOB_PROPERTIES are kept.
+    Entries that are too short are passed on as tuples as well, so that they
+    sort together with the records.
+    """
+    for entry in entries:
+        if len(entry) < 3:
+            yield tuple(entry)
+        else:
+            props = parse_properties(''.join(entry[3:]))
+            yield (entry[0], entry[1], entry[2], {k: props[k] for k in JOB_PROPERTIES if k in props})
+
+
+def parse_file(filename, types=None):
+    """reads and parses a whole accounting file into a list of records,
+    to be run in a worker process
+    """
+    with open_accounting(filename) as accounting_file:
+        return list(parse_records(split_records(filter_records(accounting_file, types))))
+
+
+def dump_pickle(obj, filename):
+    """pickles obj to filename, writing to a temporary file first so that
+    the file is never left half written
+    """
+    tmpfile = filename + '.' + str(os.getpid())
+    with open(tmpfile, 'wb') as pickle_fd:
+        pickle.dump(obj, pickle_fd, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmpfile, filename)
+
+
+def cache_key(filename, types=None):
+    """identifies the parsed records of an accounting file: the file itself
+    by path, size, mtime and inode, and what has been parsed from it
+    """
+    st = os.stat(filename)
+    return (os.path.abspath(filename), st.st_size, st.st_mtime_ns, st.st_ino,
+            sorted(types) if types is not None else None, JOB_PROPERTIES)
+
+
+def load_file(filename, types=None, cachedir=None):
+    """returns the records of an accounting file like parse_file, but taken
+    from the cache in cachedir if the file has not changed since it has been
+    cached. Otherwise the file is parsed and its records are (re)cached.
+    """
+    if cachedir is None:
+        return parse_file(filename, types)
+    key = cache_key(filename, types)
+    # one cache file per accounting file and record type selection
+    cachename = hashlib.sha1(repr((key[0], key[4])).encode()).hexdigest()
+    cachefile = os.path.join(cachedir, cachename + '.pickle')
+    try:
+        with open(cachefile, 'rb') as cache_fd:
+            cachedkey, records = pickle.load(cache_fd)
+        if cachedkey == key:
+            return records
+    except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+        pass  # missing or unreadable, parse the file again
+
+    records = parse_file(filename, types)
+    os.makedirs(cachedir, exist_ok=True)
+    dump_pickle((key, records), cachefile)
+    return records
+
+
+def read_new_lines(filename, offset=0):
+    """returns the complete lines of an accounting file following the byte
+    offset, and the byte offset after the last complete line. The offsets of
+    compressed files are offsets into the decompressed data.
+    """
+    with open_binary(filename) as accounting_file:
+        accounting_file.seek(offset)
+        data = accounting_file.read()
+    end = data.rfind(b'\n') + 1
+    return split_lines(data[:end].decode()), offset + end
+
+
+def checkpoint_key(path):
+    """returns the key of the offset of an accounting file in a checkpoint:
+    its path without the suffix of a compressed file, so that a daily file
+    that is compressed when it is rotated keeps its offset
+    """
+    base, ext = os.path.splitext(path)
+    return base if ext in COMPRESSED_SUFFIXES else path
+
+
+def load_checkpoint(filename):
+    """returns the state saved in a checkpoint file, or None if there is no
+    checkpoint
+    """
+    try:
+        with open(filename, 'rb') as checkpoint_fd:
+            return pickle.load(checkpoint_fd)
+    except FileNotFoundError:
+        return None
+
+
+def peek_masternode(entries):
+    """returns the name of the masternode, taken from the jobid of the first
+    job entry, and the entries (including the ones peeked at)
+    """
+    entries = iter(entries)
+    first = next(e for e in entries if len(e) > 2 and e[1] not in SKIPPED_TYPES)
+    return first[2].split('.')[1], chain([first], entries)
+
+
+def update_jobs(torquejobs, entry, keeplog=False, lazy=False):
+    """processes an accounting entry into its job in torquejobs (a dictionary
+    jobid: Job), creating the job if it has not been seen yet. Returns the job,
+    or None if the entry does not describe a job
+    """
+    try:
+        # this is the jobid, but some PBS implementations use this field
+        # as license information
+        jobid = entry[2]
+        # the status entry can be one of [LQSEDRACT]:
+        # Licensed, Queued, Started, Ended, Deleted, Rerun, Aborted,
+        # Checkpointed, conTinued
+        if entry[1] in SKIPPED_TYPES:
+            return None  # skip licensing, checkpoint and continue entries
+        # check if the jobid has been seen already
+        job = torquejobs.get(jobid)
+        if job is None:
+            # No? Then create a new job instance, indexed by its jobid
+            job = Job(keeplog=keeplog, lazy=lazy)
+            torquejobs[jobid] = job
+        # call job.update() to process the entry
+        job.update(entry)
+    except IndexError:
+        print("no useful accounting line(s).")
+        return None
+    return job
+
+
+def aggregate_file(filename, types=None, keeplog=False, cachedir=None, lazy=False):
+    """processes a single accounting file on its own, to be run in a worker
+    process. Returns the csv rows of its jobs, ordered on timestamp, and the
+    partial node and user totals of those jobs
+    """
+    torquejobs = {}
+    entries = load_file(filename, types, cachedir) if cachedir else read_accounting(filename, types)
+    for entry in entries:
+        update_jobs(torquejobs, entry, keeplog, lazy)
+    totals = Totals()
+    rows = []
+    for job in sorted(torquejobs.values(), key=lambda j: j.timestamp):
+        rows.append(job.prepare_csv())
+        totals.add(job)
+    return rows, totals
+
+
+def mmap_accounting(filename, types=None, threaded=True):
+    """yields the entries of an accounting file like read_accounting, but
+    maps the file into memory and reads its lines as bytes. The record type
+    is checked on the raw bytes, and only the lines that are kept are decoded.
+    Compressed files cannot be mapped, they are read with read_accounting.
+    """
+    if compression(filename):
+        yield from read_accounting(filename, types, threaded)
+        return
+    btypes = None if types is None else {t.encode() for t in types}
+    with open(filename, 'rb') as accounting_file:
+        if os.fstat(accounting_file.fileno()).st_size == 0:
+            return  # an empty file cannot be mapped
+        with mmap.mmap(accounting_file.fileno(), 0, access=mmap.ACCESS_READ) as accounting_map:
+            for line in iter(accounting_map.readline, b''):
+                if btypes is not None:
+                    i = line.find(b';') + 1
+                    if line[i:i + 1] not in btypes:
+                        continue
+                entry = line.decode().split(';')
+                entry[0] = timestamp2epoch(entry[0])
+                yield entry
+
+
+def follow_accounting(accountingdir, interval=10):
+    """follows the accounting file of the current day like 'tail -f', and
+    yields the lines appended to it as a list per poll. After midnight, the
+    rest of the old file is read before moving on to the file of the new day.
+    This never returns.
+    """
+    filename = None
+    accounting_file = None
+    partial = ''
+    while True:
+        lines = []
+        if accounting_file is not None:
+            data = accounting_file.read()
+            if data:
+                lines = split_lines(partial + data)
+                # keep a line that is still being written for the next poll
+                partial = '' if lines[-1].endswith('\n') else lines.pop()
+        if lines:
+            yield lines
+            continue
+
+        today = accountingdir + time.strftime('%Y%m%d')
+        if today != filename:
+            try:
+                new_file = open(today, 'r')
+            except FileNotFoundError:
+                pass  # torque has not written to today's file yet
+            else:
+                if accounting_file is not None:
+                    accounting_file.close()
+                accounting_file = new_file
+                filename = today
+                partial = ''
+                continue
+        time.sleep(interval)
+
+
+def read_accounting(filename, types=None, threaded=True):
+    """yields the entries of an accounting file, keeping only the record
+    types in types (all of them when None). See open_accounting for threaded.
+    """
+    with open_accounting(filename, threaded) as accounting_file:
+        yield from split_records(filter_records(accounting_file, types))
+
+
+def follow(args, types, masternode, nodecpus):
+    """follow mode of main(): keeps the jobs and totals in memory while
+    following the accounting files from the current day on. Ended jobs are
+    appended to the job csv file and the node and user csv files are rewritten
+    after every batch of new records. Only "E"nded records are read, so no job
+    stays in memory once it has been written.
+    """
+    accountingdir = args.directory + '/server_priv/accounting/'
+    outputname = masternode + '.' + time.strftime('%Y%m%d')
+    torquejobs = {}
+    totals = Totals()
+
+    with open_output(outputname + '.csv', compress=args.gzip) as csv_fd, \
+            (JobDatabase(args.sqlite) if args.sqlite else nullcontext()) as database:
+        csv_file = JobWriter(csv_fd)
+        csv_file.writerow(header_csv())
+        try:
+            for lines in follow_accounting(accountingdir, args.interval):
+                for entry in split_records(filter_records(lines, types)):
+                    job = update_jobs(torquejobs, entry, lazy=args.lazy)
+                    if job is not None and job.status == 'E':
+                        csv_file.writerow(job.prepare_csv())
+                        if database:
+                            database.add(job)
+                        totals.add(job)
+                        del torquejobs[entry[2]]
+                csv_file.flush()
+                if database:
+                    database.flush()
+                if totals.first is not None:
+                    write_reports(outputname, totals, nodecpus, args.memory, compress=args.gzip)
+        except KeyboardInterrupt:
+            pass
+
+
+def resume(args, types, accfiles, masternode, nodecpus, combinedname):
+    """checkpoint mode of main(): continues from the byte offsets, running jobs
+    and totals saved in the checkpoint file by the previous run, and saves them
+    again afterwards. Ended jobs are appended to the job csv file. Only "E"nded
+    records are read, so no job is left behind in the checkpoint.
+    The offsets are kept by path, a file that is compressed when it is rotated
+    (file -> file.gz) continues at its offset.
+    """
+    state = load_checkpoint(args.checkpoint)
+    resumed = state is not None
+    if not resumed:
+        state = {'masternode': masternode, 'offsets': {}, 'jobs': {}, 'totals': Totals()}
+    torquejobs = state['jobs']
+    totals = state['totals']
+
+    # read whatever has been added to the accounting files since the last run
+    entries = []
+    for f in accfiles:
+        path = os.path.abspath(f)
+        key = checkpoint_key(path)
+        st = os.stat(f)
+        oldpath, inode, offset = state['offsets'].get(key, (path, st.st_ino, 0))
+        # a file that has been compressed since keeps its offset, as the
+        # offsets of compressed files count decompressed bytes
+        rotated = oldpath != path and key == oldpath
+        if (inode != st.st_ino and not rotated) or (offset > st.st_size and compression(f) is None):
+            # the file has been replaced or truncated, read it from the start
+            offset = 0
+        lines, offset = read_new_lines(f, offset)
+        state['offsets'][key] = (path, st.st_ino, offset)
+        entries.extend(split_records(filter_records(lines, types)))
+    # sort the entries on timestamp in the accounting file(s)
+    entries.sort(key=lambda e: e[:3])
+
+    masternode = masternode or state['masternode']
+    if masternode is None:
+        # peek at the first job entry, its jobid contains the masternode
+        masternode, entries = peek_masternode(entries)
+        state['masternode'] = masternode
+    outputname = masternode + '.' + combinedname
+
+    # continue the job csv file of the previous run, if there is one
+    append = resumed and os.path.exists(outputname + ('.csv.gz' if args.gzip else '.csv'))
+    with open_output(outputname + '.csv', 'a' if append else 'w', args.gzip) as csv_fd, \
+            (JobDatabase(args.sqlite) if args.sqlite else nullcontext()) as database:
+        csv_file = JobWriter(csv_fd)
+        if not append:
+            csv_file.writerow(header_csv())
+        for entry in entries:
+            job = update_jobs(torquejobs, entry, lazy=args.lazy)
+            if job is not None and job.status == 'E':
+                csv_file.writerow(job.prepare_csv())
+                if database:
+                    database.add(job)
+                totals.add(job)
+                del torquejobs[entry[2]]
+        csv_file.flush()
+
+    if totals.first is not None:
+        write_reports(outputname, totals, nodecpus, args.memory, compress=args.gzip)
+    dump_pickle(state, args.checkpoint)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Converts Torque accounting file(s) into CSV ',
@@ -205,152 +1461,218 @@ def main():
                         help='treat file argument as a pattern')
     parser.add_argument('-d', '--directory', type=str,
                         help='location of torque directory')
-    parser.add_argument('-f', '--full', action='store_true',
-                        help='output every job status line, not just jobs with status "E"nded ')
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument('-f', '--full', action='store_true',
+                           help='output every job status line, not just jobs with status "E"nded ')
+    selection.add_argument('-t', '--types', type=str,
+                           help='comma separated record types to output, e.g. "E,D,A" (default: E)')
+    parser.add_argument('-s', '--stream', action='store_true',
+                        help='merge the (timestamp ordered) accounting files while reading them '
+                             'instead of collecting and sorting all entries')
+    parser.add_argument('-i', '--incremental', action='store_true',
+                        help='write out and forget jobs as soon as they have "E"nded; '
+                             'jobs that have not ended are written at the end')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='number of processes parsing the accounting files')
+    parser.add_argument('-a', '--aggregate', action='store_true',
+                        help='process every file on its own and merge the partial totals; '
+                             'a job with records in several files counts in each of them')
+    parser.add_argument('--cache-dir', type=str,
+                        help='directory caching the parsed records of each accounting file, '
+                             'so that unchanged files are not parsed again')
+    parser.add_argument('--follow', action='store_true',
+                        help='follow the accounting file of the current day in the torque '
+                             'directory, updating the csv files as records are added')
+    parser.add_argument('--interval', type=float, default=10,
+                        help='seconds between polls of the accounting file in follow mode')
+    parser.add_argument('--checkpoint', type=str,
+                        help='checkpoint file to resume from and save to: only records added '
+                             'to the accounting files since the previous run are processed')
+    parser.add_argument('-m', '--mmap', action='store_true',
+                        help='read the accounting files as bytes through mmap')
+    parser.add_argument('-l', '--lazy', action='store_true',
+                        help='only parse the latest record of each job, when it is written out')
+    parser.add_argument('--transitions', action='store_true',
+                        help='also write the status transitions of every job to a csv file '
+                             '(most useful with --full)')
+    parser.add_argument('--memory', action='store_true',
+                        help='also write the used vs requested memory per user and queue to a csv file')
+    parser.add_argument('-z', '--gzip', action='store_true',
+                        help='write the csv files gzip compressed (.csv.gz), compressing them '
+                             'in a background thread')
+    parser.add_argument('--sqlite', type=str,
+                        help='also load the jobs into an SQLite database (jobs, job_nodes and '
+                             'users), replacing jobs that it already holds')
+    parser.add_argument('--format', choices=['csv', 'npz', 'both'], default='csv',
+                        help='write the job, node and user tables as csv files, as columns '
+                             'in a NumPy .npz file, or both')
     parser.add_argument('file', type=str, nargs='*',
                         help='file(s) or pattern(s) containing Torque accounting')
     args = parser.parse_args(argv[1:])
+    if args.follow and (not args.directory or args.file):
+        parser.error('--follow needs a torque directory and no file arguments')
+    if args.transitions and (args.aggregate or args.follow or args.checkpoint):
+        parser.error('--transitions cannot be used with --aggregate, --follow or --checkpoint')
+    if args.format != 'csv' and (args.aggregate or args.follow or args.checkpoint):
+        parser.error('--format npz cannot be used with --aggregate, --follow or --checkpoint')
+    if args.sqlite and args.aggregate:
+        parser.error('--sqlite cannot be used with --aggregate')
+    if args.mmap and (args.jobs > 1 or args.cache_dir or args.aggregate or args.follow or args.checkpoint):
+        parser.error('--mmap cannot be used with --jobs, --cache-dir, --aggregate, --follow or --checkpoint')
+    if (args.stream or args.incremental) and (args.aggregate or args.follow or args.checkpoint):
+        parser.error('--stream and --incremental cannot be used with --aggregate, --follow or --checkpoint')
+    formats = ('csv', 'npz') if args.format == 'both' else (args.format,)
+
+    # when we don't want all status entries, record only 'E'nded jobs
+    # (or the requested record types)
+    if args.full:
+        types = None
+    else:
+        types = {t.strip() for t in args.types.split(',')} if args.types else {'E'}
+        for t in types:
+            if len(t) != 1 or t not in RECORD_TYPES:
+                parser.error('unknown record type %r, the record types are %s' % (t, ','.join(RECORD_TYPES)))
+    # follow mode writes and forgets jobs when they have ended, jobs of other
+    # record types would pile up in memory
+    if args.follow and types != {'E'}:
+        parser.error('--follow only writes "E"nded jobs, it cannot be used with --full or --types')
+    if args.checkpoint and types != {'E'}:
+        parser.error('--checkpoint only writes "E"nded jobs, it cannot be used with --full or --types')
 
-    entries = []
     torquejobs = {}
-    nodecpus = {}
-    joblist = []
-    njobs = -1
+    # obtain number of cores for each node
+    nodecpus = read_nodes(args.directory) if args.directory else {}
 
     accountingdir = args.directory+'/server_priv/accounting/' if args.directory else ''
 
-    # loop over accounting files (or patterns) and build the entries list
+    # loop over accounting files (or patterns) and build the list of files
+    accfiles = []
     for accfp in args.file:
-        for f in glob.glob(accountingdir + accfp + '*' if args.pattern else accountingdir + accfp):
-            with open(f, 'r') as accounting_file:
-                for line in accounting_file:
-                    entry = line.split(';')
-                    timestamp = calendar.timegm(time.strptime(entry[0], "%m/%d/%Y %H:%M:%S"))
-                    # when we don't want all status entries, record only 'E'nded jobs
-                    if not args.full:
-                        if entry[1] != 'E':
-                            continue
-                    # *entry[] unlists a list, otherwise you will create nested lists
-                    entries.append([timestamp, *entry[1:]])
-
-    # sort the entries on timestamp in the accounting file(s). (=first element of the entry sublist)
-    entries.sort()
-
-    # now that we have sorted all the entries, go through it and build the joblist
-    for entry in entries:
-        try:
-            # this is the jobid, but some PBS implementations use this field
-            # as license information
-            jobid = entry[2]
-            # the status entry can be one of [LQSEDRACT]:
-            # Licensed, Queued, Started, Ended, Deleted, Rerun, Aborted,
-            # Checkpointed, conTinued
-            if entry[1] == 'L' or entry[1] == 'C' or entry[1] == 'T':
-                continue  # skip licensing, checkpoint and continue entries
-            # check if the jobid has been seen already
-            if jobid not in torquejobs:
-                # No? Then create a new job instance and add it to the joblist
-                job = Job()
-                njobs += 1
-                joblist.append(job)
-                # Create a reference index for each jobid, so we can retrieve
-                # each job from the joblist quickly
-                torquejobs[jobid] = njobs
-                # call job.update() to process the entry
-            joblist[torquejobs[jobid]].update(entry)
-        except IndexError:
-            print("no useful accounting line(s).")
-            continue
+        accfiles.extend(sorted(glob.glob(accountingdir + accfp + '*' if args.pattern else accountingdir + accfp)))
 
     # get the name of the masternode
+    masternode = None
     if args.directory:
         with open(args.directory+'/server_name', 'r') as master_fd:
             masternode = master_fd.readline().rstrip('\n')
-    else:
-        masternode = next(iter(torquejobs)).split('.')[1]
 
-    # sort the joblist on timestamp in the accounting file(s)
-    joblist.sort(key=lambda j: j.timestamp)
+    if args.follow:
+        follow(args, types, masternode, nodecpus)
+        return
 
     # make a concise filename for the csv output files
     combinedname = os.path.basename(args.file[0]) + '-' + os.path.basename(args.file[-1])\
         if len(args.file) > 1 else os.path.basename(args.file[0])
 
-    # write all job entries to a csv file
-    with open(masternode + '.' + combinedname + '.csv', 'w') as csv_fd:
-        csv_file = csv.writer(csv_fd)
-        csv_file.writerow(header_csv())
-        for i in joblist:
-            csv_file.writerow(i.prepare_csv())
+    if args.checkpoint:
+        resume(args, types, accfiles, masternode, nodecpus, combinedname)
+        return
 
-    # Nodes:
-    # obtain number of cores for each node
-    if args.directory:
-        with open(args.directory + '/server_priv/nodes', 'r') as node_fd:
-            for line in node_fd:
-                node = re.split(r"\snp=|\s", line)
-                node = list(filter(None, node))[:2]
-                nodecpus[node[0]] = int(node[1])
+    totals = Totals()
+    jobtable = None
 
-    # if the nodes files is missing, or if it is incomplete
-    # do a best guess by determining the maximum core # per node
-    for i in joblist:
-        for k, v in i.maxslot.items():
-            if k in nodecpus:
-                nodecpus[k] = max(nodecpus[k], v + 1)
-            else:
-                nodecpus[k] = v + 1
+    if args.aggregate:
+        # process every file on its own in the worker processes, and combine
+        # their job rows and partial totals in file order
+        with ProcessPoolExecutor(args.jobs) as pool:
+            results = pool.map(aggregate_file, accfiles, repeat(types), repeat(False),
+                               repeat(args.cache_dir), repeat(args.lazy))
+            if masternode is None:
+                # peek at the first job row, its jobid contains the masternode
+                first = next(r for r in results if r[0])
+                results = chain([first], results)
+                masternode = first[0][0][1].split('.')[1]
+            outputname = masternode + '.' + combinedname
 
-    # the next block computes node usage as a total of
-    # requested cores x walltime in seconds
-    nodeusage = Counter(joblist[0].usage)
-    for i in joblist[1:]:
-        nodeusage.update(Counter(i.usage))
+            with open_output(outputname + '.csv', compress=args.gzip) as csv_fd:
+                csv_file = JobWriter(csv_fd)
+                csv_file.writerow(header_csv())
+                for rows, partial in results:
+                    csv_file.writerows(rows)
+                    totals.merge(partial)
+                csv_file.flush()
+    else:
+        if args.jobs > 1:
+            # parse the files in worker processes, which return the records of
+            # each file as a (timestamp ordered) list
+            with ProcessPoolExecutor(args.jobs) as pool:
+                perfile = list(pool.map(load_file, accfiles, repeat(types), repeat(args.cache_dir)))
+        elif args.cache_dir:
+            perfile = [load_file(f, types, args.cache_dir) for f in accfiles]
+        else:
+            reader = mmap_accounting if args.mmap else read_accounting
+            # merging opens all files at once, decompress them without a thread
+            # each so that memory stays bounded
+            perfile = [reader(f, types, not args.stream) for f in accfiles]
 
-    sortednodeusage = dict(sorted(nodeusage.items(), key=lambda item: item[0]))
+        if args.stream:
+            # each accounting file is written in timestamp order, so merging the
+            # files keeps the entries sorted without holding all of them in memory
+            entries = heapq.merge(*perfile, key=itemgetter(0))
+        else:
+            entries = list(chain.from_iterable(perfile))
+            # sort the entries on timestamp in the accounting file(s). (=first element of the entry sublist)
+            entries.sort(key=lambda e: e[:3])
 
-    # compute the time interval over all accounting files in seconds
-    loginterval = epoch_interval(joblist[0].timestamp, joblist[-1].timestamp)
+        if masternode is None:
+            # peek at the first job entry, its jobid contains the masternode
+            masternode, entries = peek_masternode(entries)
+        outputname = masternode + '.' + combinedname
 
-    # output node information to a csv
-    with open(masternode + '.' + combinedname + '.nodes.csv', 'w') as csv_fd:
-        csv_file = csv.writer(csv_fd)
-        csv_file.writerow(header_nodes_csv())
-        for i in sortednodeusage:
-            snu = sortednodeusage[i]
-            ncpu = nodecpus[i]
-            nodeload = [i, ncpu, snu / 3600, 100 * snu/(ncpu * loginterval) if ncpu * loginterval > 0 else 0]
-            nodeload = [x if type(x) is str or type(x) is int else format(x, '.2f') for x in nodeload]
-            csv_file.writerow(nodeload)
-
-    # Users:
-    # make a dict with usernames, actual cpuseconds used, and requested cpu times the walltime used
-    # this allows for computing the degree of parallelisation per user
-    userdict = defaultdict(Users)
-    for i in joblist:
-        # is the user field filled in? If not, then it's most likely an array job.
-        if (i.user):
-            if (i.user not in userdict):
-                # new user
-                userdict[i.user] = Users(i.user, i.rucputime, i.reqcpus * i.ruwalltime)
-            else:
-                # existing user
-                userdict[i.user].update(i.rucputime, i.reqcpus * i.ruwalltime)
+        # keep every job in a columnar table for the binary export, the totals
+        # are then summed over its columns
+        jobtable = JobTable() if 'npz' in formats else None
 
-    sorteduser = dict(sorted(userdict.items(), key=lambda item: item[1].usedcpuseconds, reverse=True))
+        # write all job entries to a csv file, and their transitions if asked for
+        with (open_output(outputname + '.csv', compress=args.gzip) if 'csv' in formats else nullcontext()) as csv_fd, \
+                (open_output(outputname + '.transitions.csv', compress=args.gzip) if args.transitions else nullcontext()) as transitions_fd, \
+                (JobDatabase(args.sqlite) if args.sqlite else nullcontext()) as database:
+            csv_file = None
+            if csv_fd:
+                csv_file = JobWriter(csv_fd)
+                csv_file.writerow(header_csv())
+            transitions_file = None
+            if transitions_fd:
+                transitions_file = csv.writer(transitions_fd)
+                transitions_file.writerow(header_transitions_csv())
 
-    # output users information to a csv
-    # convert cpuseconds to cpuhours and calculate percentage of parallelization
-    with open(masternode + '.' + combinedname + '.users.csv', 'w') as csv_fd:
-        csv_file = csv.writer(csv_fd)
-        csv_file.writerow(header_users_csv())
-        for k in sorteduser:
-            assert(k == sorteduser[k].user)
-            u = sorteduser[k].usedcpuseconds
-            r = sorteduser[k].reqcpuseconds
-            billing = [k, u/3600, r/3600, 100 * u/r if r > 0 else 0]
-            billing = [x if type(x) is str else format(x, '.2f') for x in billing]
-            csv_file.writerow(billing)
+            def write_job(job):
+                if csv_file:
+                    csv_file.writerow(job.prepare_csv())
+                if transitions_file:
+                    transitions_file.writerows(job.prepare_transitions())
+                if jobtable is not None:
+                    jobtable.append(job)
+                if database:
+                    database.add(job)
+
+            # now that we have sorted all the entries, go through it and build the joblist
+            for entry in entries:
+                job = update_jobs(torquejobs, entry, args.transitions, args.lazy)
+                if job is None:
+                    continue
+                if args.incremental and job.status == 'E':
+                    # the job has exited, so write it out, fold it into the totals
+                    # and forget about it
+                    write_job(job)
+                    if jobtable is None:
+                        totals.add(job)
+                    del torquejobs[entry[2]]
+
+            # sort the (remaining) jobs on timestamp in the accounting file(s)
+            joblist = sorted(torquejobs.values(), key=lambda j: j.timestamp)
+            for i in joblist:
+                write_job(i)
+            if csv_file:
+                csv_file.flush()
+
+        if jobtable is not None:
+            jobtable.totals(totals)
+        else:
+            for i in joblist:
+                totals.add(i)
+
+    write_reports(outputname, totals, nodecpus, args.memory, formats, jobtable, args.gzip)
 
 
 if __name__ == "__main__":
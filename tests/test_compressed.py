@@ -0,0 +1,66 @@
+import bz2
+import gzip
+import io
+import lzma
+
+import pytest
+
+from job import DecompressedLines, open_accounting, read_accounting, read_new_lines, split_lines
+
+LINES = [
+    '12/31/2021 10:00:00;Q;1.master;queue=batch\n',
+    '12/31/2021 10:00:01;E;1.master;user=user01 Job_Name=a\x1cb\x0bc\x85d e queue=batch\n',
+    '12/31/2021 10:00:02;E;2.master;user=user02 queue=long\r\n',
+    '12/31/2021 10:00:03;D;3.master;requestor=user03@login',
+]
+DATA = ''.join(LINES).encode()
+
+
+@pytest.mark.parametrize('text', [
+    '', 'a', 'a\n', 'a\nb', '\n\n', 'a\r\nb\rc\n', 'a\x1cb\x0bc\x0cd\x1d\x1e\x85  \n',
+])
+def test_split_lines_like_a_text_file(text):
+    assert split_lines(text) == list(io.StringIO(text, newline=None))
+
+
+@pytest.fixture(params=[(gzip, '.gz'), (bz2, '.bz2'), (lzma, '.xz')])
+def files(request, tmp_path):
+    module, suffix = request.param
+    plain = tmp_path / 'accounting'
+    plain.write_bytes(DATA)
+    compressed = tmp_path / ('accounting' + suffix)
+    with module.open(compressed, 'wb') as compressed_fd:
+        compressed_fd.write(DATA)
+    return str(plain), str(compressed), module
+
+
+@pytest.mark.parametrize('threaded', [True, False])
+def test_same_lines_as_the_plain_file(files, threaded):
+    plain, compressed, _ = files
+    with open_accounting(plain) as plain_fd, open_accounting(compressed, threaded) as compressed_fd:
+        assert list(compressed_fd) == list(plain_fd)
+
+
+@pytest.mark.parametrize('threaded', [True, False])
+def test_same_entries_as_the_plain_file(files, threaded):
+    plain, compressed, _ = files
+    assert list(read_accounting(compressed, None, threaded)) == list(read_accounting(plain))
+    assert list(read_accounting(compressed, {'E'}, threaded)) == list(read_accounting(plain, {'E'}))
+
+
+@pytest.mark.parametrize('chunksize', [1, 7, 64])
+def test_lines_across_chunks(files, chunksize):
+    plain, compressed, module = files
+    with open(plain) as plain_fd, DecompressedLines(module.open(compressed, 'rb'), chunksize) as lines:
+        assert list(lines) == list(plain_fd)
+
+
+def test_read_new_lines(files):
+    plain, compressed, _ = files
+    with open(plain) as plain_fd:
+        expected = list(plain_fd)
+    second = len(LINES[0]) + len(LINES[1].encode())
+    for filename in (plain, compressed):
+        # the last line is not complete yet
+        assert read_new_lines(filename) == (expected[:3], len(DATA) - len(LINES[3]))
+        assert read_new_lines(filename, second) == (expected[2:3], len(DATA) - len(LINES[3]))
@@ -0,0 +1,60 @@
+import sqlite3
+
+from job import JobDatabase, split_records, update_jobs
+
+
+def record(jobid, timestamp='12/31/2021 10:00:00', exec_host='node01/0-3+node02/0-3', cput='01:00:00', slots=8):
+    return ('%s;E;%s;user=user01 group=grp queue=batch ctime=1640944800 qtime=1640944800 '
+            'etime=1640944800 start=1640944800 owner=user01@login exec_host=%s '
+            'Resource_List.nodes=2:ppn=4 Resource_List.mem=8gb total_execution_slots=%d end=1640948400 Exit_status=0 '
+            'resources_used.cput=%s resources_used.mem=1024kb resources_used.vmem=2048kb '
+            'resources_used.walltime=01:00:00\n' % (timestamp, jobid, exec_host, slots, cput))
+
+
+def load(filename, lines, chunksize=10000):
+    """loads the jobs of the lines like the incremental modes do: every
+    job is added and forgotten as soon as it has ended
+    """
+    with JobDatabase(filename, chunksize) as database:
+        torquejobs = {}
+        for entry in split_records(lines):
+            job = update_jobs(torquejobs, entry)
+            database.add(job)
+            del torquejobs[entry[2]]
+
+
+def query(filename, sql):
+    connection = sqlite3.connect(filename)
+    try:
+        return sorted(connection.execute(sql).fetchall())
+    finally:
+        connection.close()
+
+
+def test_load(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    load(db, [record('1.master'), record('2.master', exec_host='node03/0', slots=1)])
+    assert query(db, 'SELECT jobid, user, cores, used_cputime FROM jobs') == [
+        ('1.master', 'user01', 8, 3600), ('2.master', 'user01', 1, 3600)]
+    assert query(db, 'SELECT jobid, node, cores, maxslot, cpuseconds FROM job_nodes') == [
+        ('1.master', 'node01', 4, 3, 14400), ('1.master', 'node02', 4, 3, 14400),
+        ('2.master', 'node03', 1, 0, 3600)]
+    assert query(db, 'SELECT * FROM users') == [('user01', 7200, 32400)]
+
+
+def test_second_record_in_one_chunk(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    load(db, [record('1.master'),
+              record('1.master', '12/31/2021 11:00:00', 'node01/0-3+node03/0-3', '02:00:00')])
+    assert query(db, 'SELECT jobid, timestamp, used_cputime FROM jobs') == [
+        ('1.master', 1640948400, 7200)]
+    assert query(db, 'SELECT node FROM job_nodes') == [('node01',), ('node03',)]
+
+
+def test_second_record_in_a_later_load(tmp_path):
+    db = str(tmp_path / 'jobs.db')
+    load(db, [record('1.master'), record('2.master')], chunksize=1)
+    load(db, [record('1.master', exec_host='node04/0', slots=1)])
+    assert query(db, 'SELECT jobid, cores FROM jobs') == [('1.master', 1), ('2.master', 8)]
+    assert query(db, 'SELECT jobid, node FROM job_nodes') == [
+        ('1.master', 'node04'), ('2.master', 'node01'), ('2.master', 'node02')]
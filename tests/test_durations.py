@@ -0,0 +1,24 @@
+import pytest
+
+from job import hms2sec
+
+
+@pytest.mark.parametrize('duration, seconds', [
+    ('00:00:00', 0),
+    ('01:02:03', 3723),
+    ('120:00:01', 432001),
+    ('2:03:04:05', 2 * 86400 + 3 * 3600 + 4 * 60 + 5),
+    ('0:00:00:01', 1),
+    ('59:59', 3599),
+    ('05:00', 300),
+    ('3600', 3600),
+    ('0', 0),
+])
+def test_forms(duration, seconds):
+    assert hms2sec(duration) == seconds
+
+
+@pytest.mark.parametrize('duration', ['1:2:3:4:5', '', '01:xx:00', '1::2', '12:34:56\x00'])
+def test_invalid(duration):
+    with pytest.raises(ValueError):
+        hms2sec(duration)
@@ -0,0 +1,65 @@
+import pytest
+
+from job import SymbolTable, count_slots, decode_exec_host
+
+
+@pytest.mark.parametrize('slots, expected', [
+    ('', (1, 0)),
+    ('3', (1, 3)),
+    ('0-15', (16, 15)),
+    ('4-4', (1, 4)),
+    ('0,2,4-7', (6, 7)),
+    ('8-11,0-3', (8, 11)),
+])
+def test_count_slots(slots, expected):
+    assert count_slots(slots) == expected
+
+
+@pytest.mark.parametrize('slots', ['5-2', '0,7-6', 'a', '1-b', '1,,2'])
+def test_count_slots_bad_input(slots):
+    with pytest.raises(ValueError):
+        count_slots(slots)
+
+
+def test_expanded_form():
+    cores, maxslot = decode_exec_host('node01/0+node01/1+node02/0', SymbolTable())
+    assert cores == {'node01': 2, 'node02': 1}
+    assert maxslot == {'node01': 1, 'node02': 0}
+
+
+def test_ranges_and_comma_lists():
+    cores, maxslot = decode_exec_host('node01/0-15+node02/0,2,4-7', SymbolTable())
+    assert cores == {'node01': 16, 'node02': 6}
+    assert maxslot == {'node01': 15, 'node02': 7}
+
+
+def test_repeated_nodes():
+    cores, maxslot = decode_exec_host('node01/8-11+node02/0+node01/0-3+node01/20', SymbolTable())
+    assert cores == {'node01': 9, 'node02': 1}
+    assert maxslot == {'node01': 20, 'node02': 0}
+
+
+def test_expanded_and_range_forms_agree():
+    expanded = '+'.join('node%02d/%d' % (n, s) for n in range(4) for s in range(16))
+    ranges = '+'.join('node%02d/0-15' % n for n in range(4))
+    assert decode_exec_host(expanded, SymbolTable()) == decode_exec_host(ranges, SymbolTable())
+
+
+def test_node_names_are_interned():
+    nodes = SymbolTable()
+    cores, _ = decode_exec_host('node01/0', nodes)
+    other, _ = decode_exec_host(''.join(['node', '01/1']), nodes)
+    assert next(iter(cores)) is next(iter(other))
+    assert nodes.names == ['node01']
+
+
+def test_empty_parts_are_skipped():
+    cores, maxslot = decode_exec_host('node01/0++/3', SymbolTable())
+    assert cores == {'node01': 1}
+    assert maxslot == {'node01': 0}
+
+
+@pytest.mark.parametrize('exec_host', ['node01/5-2', 'node01/0+node02/x'])
+def test_bad_input(exec_host):
+    with pytest.raises(ValueError):
+        decode_exec_host(exec_host, SymbolTable())
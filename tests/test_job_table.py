@@ -0,0 +1,58 @@
+import pytest
+
+from benchmarks.synthetic import accounting_lines
+from job import JobTable, Totals, split_records, update_jobs
+
+EXTRA = [
+    # a job without a user (array job), one without a memory request and a
+    # job that has only started
+    '01/01/2022 10:00:00;E;9001.master.cluster;user= group=grp queue=batch start=1641027600 '
+    'exec_host=node001/0-3 total_execution_slots=4 end=1641031200 Exit_status=0 '
+    'resources_used.cput=01:00:00 resources_used.mem=1024kb resources_used.walltime=01:00:00 '
+    'Resource_List.mem=1gb\n',
+    '01/01/2022 11:00:00;E;9002.master.cluster;user=user99 group=grp queue=long start=1641027600 '
+    'exec_host=node001/4+node002/0 total_execution_slots=2 end=1641034800 Exit_status=1 '
+    'resources_used.cput=00:30:00 resources_used.mem=2mb resources_used.walltime=02:00:00\n',
+    '01/01/2022 12:00:00;S;9003.master.cluster;user=user98 group=grp queue=short start=1641038400 '
+    'exec_host=node003/0-7 total_execution_slots=8\n',
+]
+
+
+def jobs(types):
+    entries = sorted(split_records(accounting_lines(3, 100) + EXTRA), key=lambda e: e[0])
+    torquejobs = {}
+    for entry in entries:
+        if types is None or entry[1] in types:
+            update_jobs(torquejobs, entry)
+    return list(torquejobs.values())
+
+
+def summary(totals):
+    return (dict(totals.nodeusage), totals.nodecpus,
+            {k: (u.usedcpuseconds, u.reqcpuseconds) for k, u in totals.users.items()},
+            totals.memory, totals.first, totals.last)
+
+
+@pytest.mark.parametrize('types', [{'E'}, None])
+def test_totals_equal_folding_the_jobs(types):
+    joblist = jobs(types)
+    folded = Totals()
+    for job in joblist:
+        folded.add(job)
+    assert summary(JobTable.from_jobs(joblist).totals()) == summary(folded)
+
+
+def test_totals_add_to_existing_totals():
+    joblist = jobs({'E'})
+    half = len(joblist) // 2
+    folded = Totals()
+    for job in joblist:
+        folded.add(job)
+    partial = Totals()
+    for job in joblist[:half]:
+        partial.add(job)
+    assert summary(JobTable.from_jobs(joblist[half:]).totals(partial)) == summary(folded)
+
+
+def test_empty_table():
+    assert summary(JobTable().totals()) == summary(Totals())
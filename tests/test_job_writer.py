@@ -0,0 +1,32 @@
+import csv
+import io
+
+import pytest
+
+from job import JobWriter, header_csv
+
+
+def row(jobid='1.master', user='user01', queue='batch'):
+    return (1640995200, jobid, user, 'E', '0', queue, '1', '2', '3', 1, 8, 100, 2048, 60)
+
+
+@pytest.mark.parametrize('rows', [
+    [row()],
+    [row(), row(jobid='2.master')] * 5,
+    [row(), row(jobid='2.master\n'), row()],
+    [row(jobid='3.master\r\n'), row(user='a,b'), row(queue='q"x'), row(user='cr\r')],
+    [row(user=''), row(queue='')],
+    [],
+])
+def test_same_as_csv_writer(rows):
+    expected = io.StringIO()
+    writer = csv.writer(expected)
+    writer.writerow(header_csv())
+    writer.writerows(rows)
+
+    written = io.StringIO()
+    job_writer = JobWriter(written, chunksize=2)
+    job_writer.writerow(header_csv())
+    job_writer.writerows(rows)
+    job_writer.flush()
+    assert written.getvalue() == expected.getvalue()
@@ -0,0 +1,31 @@
+import pytest
+
+from job import mem2bytes
+
+
+@pytest.mark.parametrize('size, nbytes', [
+    ('100b', 100),
+    ('1234kb', 1234 * 2**10),
+    ('512mb', 512 * 2**20),
+    ('16gb', 16 * 2**30),
+    ('2tb', 2 * 2**40),
+    ('1pb', 2**50),
+    ('16GB', 16 * 2**30),
+    (' 8kb\n', 8 * 2**10),
+    ('10w', 80),
+    ('10kw', 80 * 2**10),
+    ('512mw', 8 * 512 * 2**20),
+    ('4gw', 8 * 4 * 2**30),
+    ('100', 100),
+    ('0', 0),
+    ('0kb', 0),
+    ('', 0),
+])
+def test_sizes(size, nbytes):
+    assert mem2bytes(size) == nbytes
+
+
+@pytest.mark.parametrize('size', ['gb', 'kb', '12xb', '12kgb', '12bb', '-1kb', '1.5gb', 'abc', '12 kb'])
+def test_invalid(size):
+    with pytest.raises(ValueError):
+        mem2bytes(size)
@@ -0,0 +1,35 @@
+import pytest
+
+from job import parse_properties
+
+
+def test_key_ends_at_the_first_equal_sign():
+    assert parse_properties('Resource_List.nodes=2:ppn=4') == {'Resource_List.nodes': '2:ppn=4'}
+
+
+@pytest.mark.parametrize('message, expected', [
+    ('user=user01 queue=batch', {'user': 'user01', 'queue': 'batch'}),
+    ('user=user01 queue=batch\n', {'user': 'user01', 'queue': 'batch'}),
+    ('  user=user01   queue=batch  ', {'user': 'user01', 'queue': 'batch'}),
+    ('', {}),
+])
+def test_properties(message, expected):
+    assert parse_properties(message) == expected
+
+
+def test_values_with_spaces():
+    props = parse_properties('jobname=my job  name queue=batch comment=two words\n')
+    assert props == {'jobname': 'my job name', 'queue': 'batch', 'comment': 'two words'}
+
+
+def test_empty_values():
+    assert parse_properties('account= queue=batch') == {'account': '', 'queue': 'batch'}
+    assert parse_properties('queue=batch account=') == {'queue': 'batch', 'account': ''}
+
+
+def test_tokens_before_the_first_key_are_dropped():
+    assert parse_properties('stray user=user01') == {'user': 'user01'}
+
+
+def test_later_key_wins():
+    assert parse_properties('queue=batch queue=long') == {'queue': 'long'}
@@ -0,0 +1,54 @@
+import calendar
+import time
+
+import pytest
+
+from job import timestamp2epoch
+
+
+def strptime_epoch(timestamp):
+    return calendar.timegm(time.strptime(timestamp, "%m/%d/%Y %H:%M:%S"))
+
+
+@pytest.mark.parametrize('timestamp', [
+    '01/01/1970 00:00:00',
+    '01/31/2021 23:59:59',
+    '02/01/2021 00:00:00',
+    '02/28/2021 23:59:59',
+    '03/01/2021 00:00:00',
+    '02/29/2020 12:34:56',
+    '03/01/2020 00:00:01',
+    '12/31/2021 23:59:59',
+    '01/01/2022 00:00:00',
+    '06/30/2022 08:07:06',
+])
+def test_boundaries(timestamp):
+    assert timestamp2epoch(timestamp) == strptime_epoch(timestamp)
+
+
+def test_every_hour_over_a_year_boundary():
+    # the last and first days of the years, and a leap day
+    start = calendar.timegm((2019, 12, 30, 0, 0, 0))
+    for epoch in range(start, start + 800 * 86400, 3599):
+        timestamp = time.strftime("%m/%d/%Y %H:%M:%S", time.gmtime(epoch))
+        assert timestamp2epoch(timestamp) == epoch == strptime_epoch(timestamp)
+
+
+@pytest.mark.parametrize('timestamp', [
+    '1/1/2021 00:00:00',
+    '01/01/2021 00:00',
+    '',
+    '01/01/2021 99:99:99',
+    '01/01/2021 24:00:00',
+    '01/01/2021 23:60:00',
+    '01/01/2021 23:59:60',
+    '01/01/2021x-1:00:00',
+    '01/01/2021 -1:00:00',
+    '01/01/2021 00-00-00',
+    '01/01/2021 0a:00:00',
+    '13/01/2021 00:00:00',
+    '02/30/2021 00:00:00',
+])
+def test_invalid(timestamp):
+    with pytest.raises(ValueError):
+        timestamp2epoch(timestamp)